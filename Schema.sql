@@ -154,10 +154,18 @@ CREATE TABLE payment (
     payment_date DATETIME DEFAULT CURRENT_TIMESTAMP,
     amount DECIMAL(10,2),
     payment_mode VARCHAR(20) CHECK (payment_mode IN ('CreditCard','DebitCard','UPI','Wallet')),
-    payment_status VARCHAR(10) DEFAULT 'Success' CHECK (payment_status IN ('Success','Failed','Pending')),
+    payment_status VARCHAR(10) DEFAULT 'Success',
+    CONSTRAINT payment_status_chk CHECK (payment_status IN ('Success','Failed','Pending','Refunding','Refunded')),
     FOREIGN KEY (booking_id) REFERENCES bookings(booking_id)
 );
 
+-- Existing databases: replace the old inline payment_status CHECK, which only allowed
+-- Success/Failed/Pending. MySQL names inline checks payment_chk_<n>; confirm the name
+-- with SHOW CREATE TABLE payment before dropping it.
+-- ALTER TABLE payment DROP CHECK payment_chk_2;
+-- ALTER TABLE payment ADD CONSTRAINT payment_status_chk
+--     CHECK (payment_status IN ('Success','Failed','Pending','Refunding','Refunded'));
+
 INSERT INTO payment (booking_id, amount, payment_mode, payment_status)
 VALUES 
 (1, 5200.00, 'UPI', 'Success'),
@@ -1,11 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, DECIMAL, ForeignKey, CheckConstraint
-from sqlalchemy.orm import sessionmaker, declarative_base, Session, relationship
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, DECIMAL, ForeignKey, CheckConstraint, event, func, inspect, select, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker, declarative_base, Session, relationship, object_session
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-import random, decimal, uuid, string, asyncio
-from typing import List, Optional
+import random, decimal, uuid, string, asyncio, bisect, re, heapq, threading, unicodedata, csv, io, json, tempfile, time, os, logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from pricing import PRICING_POLICY, calculate_dynamic_price, is_premium_airline
 
 
 MYSQL_USER = "root"
@@ -13,8 +19,21 @@ MYSQL_PASSWORD = "2464"
 MYSQL_HOST = "localhost"
 MYSQL_DB = "FlightS_booking"
 
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}"
+DATABASE_URL = os.environ.get("DATABASE_URL", f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}")
 engine = create_engine(DATABASE_URL, echo=False, future=True)
+
+if engine.dialect.name == "sqlite":
+    # SQLite ignores SELECT ... FOR UPDATE, so take the database write lock at BEGIN instead;
+    # otherwise concurrent reserve/pay/cancel calls can oversell or leak seats.
+    @event.listens_for(engine, "connect")
+    def _sqlite_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+        dbapi_connection.execute("PRAGMA busy_timeout=30000")
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
@@ -70,7 +89,7 @@ class Booking(Base):
     status = Column(String(30), default="Pending")
     price = Column(DECIMAL(12,2))
     created_at = Column(DateTime, default=datetime.utcnow)
-    flight = relationship("Flight")
+    flight = relationship("Flight", foreign_keys=[flight_id])
 
 class FareHistory(Base):
     __tablename__ = "fare_history"
@@ -108,6 +127,9 @@ class Payment(Base):
     payment_mode = Column(String(20))
     payment_status = Column(String(10), default="Success")
     booking = relationship("Booking")
+    __table_args__ = (
+        CheckConstraint("payment_status IN ('Success','Failed','Pending','Refunding','Refunded')", name="payment_status_chk"),
+    )
 
 Base.metadata.create_all(engine)
 
@@ -158,6 +180,47 @@ class FareHistoryOutSchema(BaseModel):
     timestamp: datetime
     fare: float
 
+class PaymentStatusOut(BaseModel):
+    payment_id: int
+    pnr: Optional[str]
+    amount: Optional[float]
+    payment_mode: Optional[str]
+    payment_status: str
+    booking_status: Optional[str]
+    payment_date: Optional[datetime]
+
+class RouteStatsOut(BaseModel):
+    origin: Optional[str]
+    destination: Optional[str]
+    day: Optional[str]
+    flights: int
+    total_seats: int
+    seats_sold: int
+    load_factor: float
+    confirmed_bookings: int
+    revenue: float
+    bookings_24h: int
+    avg_fare: Optional[float]
+
+class AirlineStatsOut(BaseModel):
+    airline_name: Optional[str]
+    day: Optional[str]
+    flights: int
+    total_seats: int
+    seats_sold: int
+    load_factor: float
+    confirmed_bookings: int
+    revenue: float
+    bookings_24h: int
+    avg_fare: Optional[float]
+
+class AirportSuggestionOut(BaseModel):
+    iata_code: str
+    name: str
+    city: str
+    country: str
+    popularity: int
+
 def get_db():
     db = SessionLocal()
     try:
@@ -172,16 +235,519 @@ def generate_pnr(length: int = 6) -> str:
 def generate_trans_id() -> str:
     return str(uuid.uuid4()).replace('-', '')[:20]
 
-def calculate_dynamic_price(base_fare, seats_available, total_seats, departure, airline_name="standard"):
-    base = float(base_fare) if not isinstance(base_fare, float) else base_fare
-    seat_ratio = seats_available / total_seats if total_seats else 0
-    seat_factor = 0.4 * (1 - seat_ratio)
-    days = (departure - datetime.utcnow()).total_seconds() / 86400 if departure else 0
-    time_factor = 0.6 if days <= 0 else 0.4 if days <= 1 else 0.2 if days <= 3 else 0.1 if days <= 7 else -0.05
-    demand_factor = random.uniform(-0.08, 0.25)
-    tier_factor = 0.12 if "premium" in airline_name.lower() or "air india" in airline_name.lower() else -0.03
-    total_multiplier = 1 + seat_factor + time_factor + demand_factor + tier_factor
-    return max(round(base * total_multiplier, 2), 50.0)
+def fold_text(value) -> str:
+    """Lower-case and strip diacritics so "São Paulo" and "sao paulo" compare equal."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return " ".join(re.findall(r"\w+", "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()))
+
+class AirportSuggestIndex:
+    """Sorted-array prefix index over airport IATA codes, city names and airport names.
+
+    Every airport is indexed under its IATA code plus each word-suffix of its
+    city and name ("indira gandhi international airport", "gandhi international
+    airport", ...), so a prefix lookup is two bisects over ``_keys``. Results are
+    ranked by how many flights serve the airport's city. Airports and flights are
+    added and removed incrementally; nothing here touches the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._ids: List[int] = []
+        self._airports: Dict[int, tuple] = {}
+        self._city_flights: Dict[str, int] = {}
+
+    @staticmethod
+    def _index_keys(iata_code, city, name):
+        keys = {fold_text(iata_code)}
+        for text in (city, name):
+            words = fold_text(text).split()
+            keys.update(" ".join(words[i:]) for i in range(len(words)))
+        keys.discard("")
+        return keys
+
+    def _insert(self, airport_id, iata_code, name, city, country):
+        self._airports[airport_id] = (iata_code, name, city, country, fold_text(city), fold_text(iata_code))
+        for key in self._index_keys(iata_code, city, name):
+            pos = bisect.bisect_left(self._keys, key)
+            self._keys.insert(pos, key)
+            self._ids.insert(pos, airport_id)
+
+    def _delete(self, airport_id):
+        airport = self._airports.pop(airport_id, None)
+        if airport is None:
+            return
+        iata_code, name, city = airport[0], airport[1], airport[2]
+        for key in self._index_keys(iata_code, city, name):
+            pos = bisect.bisect_left(self._keys, key)
+            while pos < len(self._keys) and self._keys[pos] == key:
+                if self._ids[pos] == airport_id:
+                    del self._keys[pos], self._ids[pos]
+                    break
+                pos += 1
+
+    def rebuild(self, airports, city_flights):
+        with self._lock:
+            self._keys, self._ids, self._airports = [], [], {}
+            self._city_flights = {}
+            for city, count in city_flights:
+                folded = fold_text(city)
+                self._city_flights[folded] = self._city_flights.get(folded, 0) + count
+            entries = []
+            for a in airports:
+                self._airports[a.airport_id] = (a.iata_code, a.name, a.city, a.country, fold_text(a.city), fold_text(a.iata_code))
+                entries.extend((key, a.airport_id) for key in self._index_keys(a.iata_code, a.city, a.name))
+            entries.sort()
+            self._keys = [key for key, _ in entries]
+            self._ids = [airport_id for _, airport_id in entries]
+
+    def upsert_airport(self, airport_id, iata_code, name, city, country):
+        with self._lock:
+            self._delete(airport_id)
+            self._insert(airport_id, iata_code, name, city, country)
+
+    def remove_airport(self, airport_id):
+        with self._lock:
+            self._delete(airport_id)
+
+    def add_route(self, origin, destination, delta=1):
+        with self._lock:
+            for city in (origin, destination):
+                folded = fold_text(city)
+                if folded:
+                    self._city_flights[folded] = max(0, self._city_flights.get(folded, 0) + delta)
+
+    def suggest(self, query, limit=10):
+        q = fold_text(query)
+        if not q:
+            return []
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, q)
+            hi = bisect.bisect_left(self._keys, q + "\uffff", lo)
+            candidates = set(self._ids[lo:hi])
+            ranked = heapq.nsmallest(limit, (
+                (0 if self._airports[i][5] == q else 1,
+                 -self._city_flights.get(self._airports[i][4], 0),
+                 self._airports[i][0], i)
+                for i in candidates
+            ))
+            return [
+                {"iata_code": self._airports[i][0], "name": self._airports[i][1], "city": self._airports[i][2],
+                 "country": self._airports[i][3], "popularity": -neg_popularity}
+                for _, neg_popularity, _, i in ranked
+            ]
+
+airport_index = AirportSuggestIndex()
+
+def load_airport_index(db: Session):
+    city_flights = (
+        db.query(Flight.origin, func.count()).group_by(Flight.origin).all()
+        + db.query(Flight.destination, func.count()).group_by(Flight.destination).all()
+    )
+    airport_index.rebuild(db.query(Airport).all(), city_flights)
+
+# Mapper events fire at flush time, so index changes are queued on the session and only
+# applied once its transaction commits; a transaction that ends any other way (rollback,
+# close) drops them.
+def _queue_index_change(target, change, *args):
+    session = object_session(target)
+    if session is None:
+        change(*args)
+    else:
+        session.info.setdefault("airport_index_changes", []).append((change, args))
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_changes(session):
+    for change, args in session.info.pop("airport_index_changes", ()):
+        change(*args)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_index_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("airport_index_changes", None)
+
+@event.listens_for(Airport, "after_insert")
+@event.listens_for(Airport, "after_update")
+def _index_airport(mapper, connection, target):
+    _queue_index_change(target, airport_index.upsert_airport, target.airport_id, target.iata_code, target.name, target.city, target.country)
+
+@event.listens_for(Airport, "after_delete")
+def _unindex_airport(mapper, connection, target):
+    _queue_index_change(target, airport_index.remove_airport, target.airport_id)
+
+@event.listens_for(Flight, "after_insert")
+def _index_flight_route(mapper, connection, target):
+    _queue_index_change(target, airport_index.add_route, target.origin, target.destination)
+
+@event.listens_for(Flight, "after_update")
+def _reindex_flight_route(mapper, connection, target):
+    state = inspect(target)
+    origin, destination = state.attrs.origin.history, state.attrs.destination.history
+    if origin.has_changes() or destination.has_changes():
+        old_origin = origin.deleted[0] if origin.deleted else target.origin
+        old_destination = destination.deleted[0] if destination.deleted else target.destination
+        _queue_index_change(target, airport_index.add_route, old_origin, old_destination, -1)
+        _queue_index_change(target, airport_index.add_route, target.origin, target.destination)
+
+@event.listens_for(Flight, "after_delete")
+def _unindex_flight_route(mapper, connection, target):
+    _queue_index_change(target, airport_index.add_route, target.origin, target.destination, -1)
+
+FLIGHT_IMPORT_BATCH_SIZE = 5000
+FLIGHT_IMPORT_MAX_ERRORS = 1000
+FLIGHT_STATUSES = ("On Time", "Delayed", "Cancelled")
+# Columns an import may change on a flight that already exists; seat inventory is left alone
+# because live bookings already count against it.
+FLIGHT_SCHEDULE_COLUMNS = ("airline_id", "origin", "destination", "departure", "arrival", "base_fare", "airline_name", "flight_status")
+
+def iter_schedule_rows(stream, fmt="csv"):
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+
+def _schedule_field(row, key, max_len=None, required=True):
+    value = row.get(key)
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"{key} is required")
+        return None
+    if max_len is not None and len(str(value)) > max_len:
+        raise ValueError(f"{key} longer than {max_len} characters")
+    return value
+
+def _schedule_datetime(row, key):
+    value = _schedule_field(row, key)
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{key} is not an ISO datetime: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+def _schedule_int(row, key, required=True):
+    value = _schedule_field(row, key, required=required)
+    if value is None:
+        return None
+    # NDJSON hands over bools and floats, which int() would quietly turn into 1 or truncate.
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{key} is not an integer: {value!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{key} is not an integer: {value!r}")
+
+def validate_schedule_row(row, airlines):
+    """Turn one CSV/NDJSON record into Flight column values, mirroring the Schema.sql constraints."""
+    if isinstance(row, Exception):
+        raise ValueError(f"invalid JSON: {row}")
+    if not isinstance(row, dict):
+        raise ValueError("row is not an object")
+    airline_id = _schedule_int(row, "airline_id", required=False)
+    if airline_id is not None and airline_id not in airlines:
+        raise ValueError(f"unknown airline_id {airline_id}")
+    departure = _schedule_datetime(row, "departure")
+    arrival = _schedule_datetime(row, "arrival")
+    if arrival <= departure:
+        raise ValueError("arrival must be after departure")
+    base_fare = _schedule_field(row, "base_fare", required=False)
+    try:
+        base_fare = decimal.Decimal(str(base_fare if base_fare is not None else "5000.00")).quantize(decimal.Decimal("0.01"))
+    except (decimal.InvalidOperation, ValueError):
+        raise ValueError(f"base_fare is not a number: {base_fare!r}")
+    if not base_fare.is_finite():
+        raise ValueError(f"base_fare is not a number: {base_fare}")
+    try:
+        in_range = 0 <= base_fare < 10 ** 8
+    except decimal.InvalidOperation:
+        in_range = False
+    if not in_range:
+        raise ValueError("base_fare out of range")
+    total_seats = _schedule_int(row, "total_seats")
+    if total_seats < 0:
+        raise ValueError("total_seats must be >= 0")
+    seats_available = _schedule_int(row, "seats_available", required=False)
+    if seats_available is None:
+        seats_available = total_seats
+    if not (0 <= seats_available <= total_seats):
+        raise ValueError("seats_available must be between 0 and total_seats")
+    airline_name = _schedule_field(row, "airline_name", 50, required=False) or airlines.get(airline_id)
+    flight_status = _schedule_field(row, "flight_status", required=False) or "On Time"
+    if flight_status not in FLIGHT_STATUSES:
+        raise ValueError(f"flight_status must be one of {', '.join(FLIGHT_STATUSES)}")
+    return {
+        "Flight_no": str(_schedule_field(row, "Flight_no", 10)),
+        "airline_id": airline_id,
+        "origin": str(_schedule_field(row, "origin", 50)),
+        "destination": str(_schedule_field(row, "destination", 50)),
+        "departure": departure,
+        "arrival": arrival,
+        "base_fare": base_fare,
+        "total_seats": total_seats,
+        "seats_available": seats_available,
+        "airline_name": str(airline_name)[:50] if airline_name else None,
+        "flight_status": flight_status,
+    }
+
+def _write_flight_batch(db: Session, rows):
+    """Upsert one batch by Flight_no and seed pricing for the new flights. Caller commits."""
+    flight_table = Flight.__table__
+    existing = {
+        r.Flight_no: r for r in db.execute(
+            select(Flight.Flight_no, Flight.Flight_id, Flight.origin, Flight.destination)
+            .where(Flight.Flight_no.in_([v["Flight_no"] for v in rows]))
+        )
+    }
+    inserts = [v for v in rows if v["Flight_no"] not in existing]
+    updates = [
+        dict({c: v[c] for c in FLIGHT_SCHEDULE_COLUMNS}, b_flight_id=existing[v["Flight_no"]].Flight_id)
+        for v in rows if v["Flight_no"] in existing
+    ]
+    if inserts:
+        db.execute(flight_table.insert(), inserts)
+        new_ids = dict(db.execute(
+            select(Flight.Flight_no, Flight.Flight_id).where(Flight.Flight_no.in_([v["Flight_no"] for v in inserts]))
+        ).all())
+        fares = [
+            (new_ids[v["Flight_no"]], v["Flight_no"], decimal.Decimal(str(calculate_dynamic_price(
+                v["base_fare"], v["seats_available"], v["total_seats"] or 1, v["departure"], v["airline_name"] or ""))))
+            for v in inserts
+        ]
+        db.execute(FareHistory.__table__.insert(), [{"flight_no": no, "fare": fare} for _, no, fare in fares])
+        db.execute(DynamicPricing.__table__.insert(), [{"flight_id": fid, "final_fare": fare} for fid, _, fare in fares])
+    if updates:
+        db.execute(flight_table.update().where(flight_table.c.Flight_id == bindparam("b_flight_id")), updates)
+    routes = [(v["origin"], v["destination"], 1) for v in inserts]
+    for v in rows:
+        old = existing.get(v["Flight_no"])
+        if old is not None and (old.origin, old.destination) != (v["origin"], v["destination"]):
+            routes += [(old.origin, old.destination, -1), (v["origin"], v["destination"], 1)]
+    return len(inserts), len(updates), routes
+
+def _record_import_error(summary, line_no, flight_no, error):
+    summary["failed"] += 1
+    if len(summary["errors"]) < FLIGHT_IMPORT_MAX_ERRORS:
+        summary["errors"].append({"line": line_no, "flight_no": flight_no, "error": str(error)})
+
+def _import_flight_batch(batch, summary):
+    db = SessionLocal()
+    try:
+        try:
+            results = [_write_flight_batch(db, [v for _, v in batch])]
+            db.commit()
+        except SQLAlchemyError:
+            # Retry row by row so one bad record doesn't sink the rest of the batch.
+            db.rollback()
+            results = []
+            for line_no, values in batch:
+                try:
+                    results.append(_write_flight_batch(db, [values]))
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    _record_import_error(summary, line_no, values["Flight_no"], getattr(e, "orig", None) or e)
+    finally:
+        db.close()
+    for inserted, updated, routes in results:
+        summary["inserted"] += inserted
+        summary["updated"] += updated
+        for origin, destination, delta in routes:
+            airport_index.add_route(origin, destination, delta)
+
+def import_flight_schedule(stream, fmt="csv", batch_size=FLIGHT_IMPORT_BATCH_SIZE):
+    """Stream a CSV/NDJSON schedule into Flight, committing every ``batch_size`` valid rows.
+
+    Rows that fail validation or the database constraints are reported in the
+    summary (the first FLIGHT_IMPORT_MAX_ERRORS of them) and skipped; they never
+    abort the import. Rows are upserted by Flight_no and the last row for a
+    Flight_no wins, whichever batches the repeats land in. Memory stays bounded
+    by ``batch_size`` whatever the file size.
+    """
+    db = SessionLocal()
+    try:
+        airlines = dict(db.query(Airline.airline_id, Airline.airline_name).all())
+    finally:
+        db.close()
+    summary = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+    batch = {}
+    for line_no, row in iter_schedule_rows(stream, fmt):
+        summary["rows"] += 1
+        try:
+            values = validate_schedule_row(row, airlines)
+        except ValueError as e:
+            _record_import_error(summary, line_no, row.get("Flight_no") if isinstance(row, dict) else None, e)
+            continue
+        # A repeat within the batch replaces the earlier row, as a later batch's upsert would.
+        batch[values["Flight_no"]] = (line_no, values)
+        if len(batch) >= batch_size:
+            _import_flight_batch(list(batch.values()), summary)
+            batch = {}
+    if batch:
+        _import_flight_batch(list(batch.values()), summary)
+    if summary["inserted"] or summary["updated"]:
+        reconcile_route_analytics()
+    return summary
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_MODES = ("CreditCard", "DebitCard", "UPI", "Wallet")
+PAYMENT_WORKERS = 8
+PAYMENT_GATEWAY_LATENCY = (1.0, 3.0)
+PAYMENT_FAILURE_RATE = 1 / 3
+PAYMENT_MAX_WAIT = 30.0
+# Bookings in these states no longer hold their seat number. A failed payment also clears
+# seat_no; Payment Failed is listed for rows settled before it did.
+SEAT_RELEASED_STATUSES = ("Cancelled", "Payment Failed")
+
+class PaymentGateway(ABC):
+    """Card/UPI processor used by the payment workers.
+
+    ``charge`` and ``refund`` are called outside any database transaction and may
+    block for as long as the real gateway takes. ``payment_id`` doubles as the
+    idempotency key, since a payment left Pending or Refunding by a crash is sent
+    again on the next startup.
+    """
+
+    @abstractmethod
+    def charge(self, payment_id: int, amount, payment_mode: str) -> bool:
+        ...
+
+    @abstractmethod
+    def refund(self, payment_id: int, amount) -> bool:
+        ...
+
+class StubPaymentGateway(PaymentGateway):
+    def __init__(self, latency=PAYMENT_GATEWAY_LATENCY, failure_rate=PAYMENT_FAILURE_RATE):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def charge(self, payment_id, amount, payment_mode):
+        time.sleep(random.uniform(*self.latency))
+        return random.random() >= self.failure_rate
+
+    def refund(self, payment_id, amount):
+        time.sleep(random.uniform(*self.latency))
+        return True
+
+payment_gateway: PaymentGateway = StubPaymentGateway()
+payment_executor = ThreadPoolExecutor(max_workers=PAYMENT_WORKERS, thread_name_prefix="payment")
+_payment_events: Dict[int, threading.Event] = {}
+_payment_events_lock = threading.Lock()
+
+def submit_payment(payment_id: int):
+    with _payment_events_lock:
+        _payment_events.setdefault(payment_id, threading.Event())
+    payment_executor.submit(process_payment, payment_id)
+
+def process_payment(payment_id: int):
+    """Charge one Pending payment, then settle it and its booking in a short transaction."""
+    db = SessionLocal()
+    try:
+        payment = db.query(Payment).filter(Payment.payment_id==payment_id).first()
+        if not payment or payment.payment_status != "Pending":
+            return
+        booking_id, amount, payment_mode = payment.booking_id, payment.amount, payment.payment_mode
+        db.rollback()
+        try:
+            success = payment_gateway.charge(payment_id, amount, payment_mode)
+        except Exception:
+            logger.exception("Charging payment %s failed", payment_id)
+            success = False
+        booking = db.query(Booking).filter(Booking.booking_id==booking_id).with_for_update().first()
+        payment = db.query(Payment).filter(Payment.payment_id==payment_id).with_for_update().first()
+        if payment.payment_status != "Pending":
+            db.rollback()
+            return
+        payment.payment_status = "Success" if success else "Failed"
+        payment.payment_date = datetime.utcnow()
+        # A booking cancelled while the charge was in flight keeps its status and its seat is
+        # already back, so a charge that went through is handed back to the customer.
+        settled = None
+        refund = success and not (booking and booking.status == "Payment Pending")
+        if refund:
+            payment.payment_status = "Refunding"
+        elif booking and booking.status == "Payment Pending":
+            if success:
+                booking.status = "Confirmed"
+                booking.trans_id = booking.trans_id or generate_trans_id()
+                settled = dict(confirmed=1, revenue=float(booking.price or 0))
+            else:
+                booking.status = "Payment Failed"
+                booking.seat_no = None
+                flight = db.query(Flight).filter(Flight.Flight_id==booking.flight_id).with_for_update().first()
+                if flight:
+                    flight.seats_available = min(flight.total_seats or 0, (flight.seats_available or 0)+1)
+                    settled = dict(seats_sold=-1)
+            flight_id = booking.flight_id
+        db.commit()
+        if settled:
+            route_analytics.record(flight_id, **settled)
+        if refund:
+            payment_executor.submit(refund_payment, payment_id)
+    except Exception:
+        logger.exception("Settling payment %s failed; it stays Pending until the next startup", payment_id)
+        db.rollback()
+    finally:
+        db.close()
+        with _payment_events_lock:
+            event = _payment_events.pop(payment_id, None)
+        if event:
+            event.set()
+
+def refund_payment(payment_id: int):
+    """Refund a Refunding payment; one the gateway turns down stays Refunding and is retried on startup."""
+    db = SessionLocal()
+    try:
+        payment = db.query(Payment).filter(Payment.payment_id==payment_id).first()
+        if not payment or payment.payment_status != "Refunding":
+            return
+        amount = payment.amount
+        db.rollback()
+        try:
+            refunded = payment_gateway.refund(payment_id, amount)
+        except Exception:
+            logger.exception("Refunding payment %s failed", payment_id)
+            refunded = False
+        if not refunded:
+            logger.warning("Payment %s was not refunded; it stays Refunding until the next startup", payment_id)
+            return
+        payment = db.query(Payment).filter(Payment.payment_id==payment_id).with_for_update().first()
+        if payment.payment_status == "Refunding":
+            payment.payment_status = "Refunded"
+            payment.payment_date = datetime.utcnow()
+        db.commit()
+    except Exception:
+        logger.exception("Recording the refund of payment %s failed", payment_id)
+        db.rollback()
+    finally:
+        db.close()
+
+def resume_pending_payments():
+    db = SessionLocal()
+    try:
+        # Payments from /bookings/pay sit on a Payment Pending booking, or a Cancelled one if the
+        # booking was cancelled mid-charge (process_payment then refunds). A Pending payment on a
+        # Confirmed booking only exists in the Schema.sql sample data and is left alone.
+        pending = db.query(Payment.payment_id).join(Booking, Payment.booking_id==Booking.booking_id).filter(
+            Payment.payment_status=="Pending", Booking.status.in_(("Payment Pending", "Cancelled"))).all()
+        refunding = db.query(Payment.payment_id).filter(Payment.payment_status=="Refunding").all()
+    finally:
+        db.close()
+    for (payment_id,) in pending:
+        submit_payment(payment_id)
+    for (payment_id,) in refunding:
+        payment_executor.submit(refund_payment, payment_id)
 
 app = FastAPI(title="Flight Booking API Full", version="1.5")
 
@@ -193,45 +759,196 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+ANALYTICS_RECONCILE_INTERVAL = 300
+LIVE_BOOKING_STATUSES = ("Reserved", "Payment Pending", "Confirmed")
+
+class GroupStats:
+    """Running totals for one (route, day) or (airline, day) group.
+
+    ``bookings_24h`` comes from 24 hourly buckets keyed by the absolute hour,
+    so stale buckets are recycled instead of trimmed.
+    """
+    __slots__ = ("flights", "total_seats", "seats_sold", "confirmed", "revenue", "fare_sum", "priced", "hour_counts", "hour_stamps")
+
+    def __init__(self):
+        self.flights = self.total_seats = self.seats_sold = self.confirmed = self.priced = 0
+        self.revenue = self.fare_sum = 0.0
+        self.hour_counts = [0] * 24
+        self.hour_stamps = [-1] * 24
+
+    def add_bookings(self, hour, count=1):
+        i = hour % 24
+        if self.hour_stamps[i] != hour:
+            self.hour_stamps[i], self.hour_counts[i] = hour, 0
+        self.hour_counts[i] += count
+
+    def as_dict(self, hour):
+        return {
+            "flights": self.flights,
+            "total_seats": self.total_seats,
+            "seats_sold": self.seats_sold,
+            "load_factor": round(self.seats_sold / self.total_seats, 4) if self.total_seats else 0.0,
+            "confirmed_bookings": self.confirmed,
+            "revenue": round(self.revenue, 2),
+            "bookings_24h": sum(c for c, h in zip(self.hour_counts, self.hour_stamps) if hour - 24 < h <= hour),
+            "avg_fare": round(self.fare_sum / self.priced, 2) if self.priced else None,
+        }
+
+class RouteAnalytics:
+    """In-memory load factor, revenue and booking velocity per route/day and airline/day.
+
+    Reserve, payment settlement, cancel and the pricing tick apply deltas after
+    they commit; ``reconcile`` rebuilds everything from the base tables
+    periodically, correcting drift from writes that bypass the API or land while
+    a rebuild is running. Reads are O(groups).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[tuple, GroupStats] = {}
+        self._airlines: Dict[tuple, GroupStats] = {}
+        # flight_id -> [route key, airline key, latest quoted fare]
+        self._flights: Dict[int, list] = {}
+
+    @staticmethod
+    def _keys(origin, destination, departure, airline_name):
+        day = departure.date().isoformat() if departure else None
+        return (origin, destination, day), (airline_name, day)
+
+    @staticmethod
+    def _hour(at=None):
+        return int((at or datetime.utcnow()).timestamp() // 3600)
+
+    def _groups(self, flight_id):
+        entry = self._flights.get(flight_id)
+        return (self._routes[entry[0]], self._airlines[entry[1]]) if entry else ()
+
+    def record(self, flight_id, seats_sold=0, confirmed=0, revenue=0.0, bookings=0):
+        hour = self._hour()
+        with self._lock:
+            for g in self._groups(flight_id):
+                g.seats_sold += seats_sold
+                g.confirmed += confirmed
+                g.revenue += revenue
+                if bookings:
+                    g.add_bookings(hour, bookings)
+
+    def record_fares(self, fares):
+        with self._lock:
+            for flight_id, fare in fares:
+                entry = self._flights.get(flight_id)
+                if entry is None:
+                    continue
+                for g in self._groups(flight_id):
+                    if entry[2] is None:
+                        g.priced += 1
+                        g.fare_sum += fare
+                    else:
+                        g.fare_sum += fare - entry[2]
+                entry[2] = fare
+
+    def reconcile(self, db: Session):
+        confirmed = {
+            flight_id: (count, float(revenue or 0)) for flight_id, count, revenue in db.query(
+                Booking.flight_id, func.count(), func.sum(Booking.price)
+            ).filter(Booking.status=="Confirmed").group_by(Booking.flight_id)
+        }
+        latest = db.query(func.max(DynamicPricing.pricing_id).label("pricing_id")).group_by(DynamicPricing.flight_id).subquery()
+        fares = dict(db.query(DynamicPricing.flight_id, DynamicPricing.final_fare).join(
+            latest, DynamicPricing.pricing_id==latest.c.pricing_id))
+        recent = db.query(Booking.flight_id, Booking.created_at).filter(
+            Booking.created_at >= datetime.utcnow() - timedelta(hours=24))
+        routes, airlines, flights = {}, {}, {}
+        for flight_id, origin, destination, departure, airline_name, total_seats, seats_available in db.query(
+            Flight.Flight_id, Flight.origin, Flight.destination, Flight.departure, Flight.airline_name,
+            Flight.total_seats, Flight.seats_available
+        ):
+            route_key, airline_key = self._keys(origin, destination, departure, airline_name)
+            fare = float(fares[flight_id]) if fares.get(flight_id) is not None else None
+            flights[flight_id] = [route_key, airline_key, fare]
+            count, revenue = confirmed.get(flight_id, (0, 0.0))
+            for g in (routes.setdefault(route_key, GroupStats()), airlines.setdefault(airline_key, GroupStats())):
+                g.flights += 1
+                g.total_seats += total_seats or 0
+                g.seats_sold += (total_seats or 0) - (seats_available if seats_available is not None else total_seats or 0)
+                g.confirmed += count
+                g.revenue += revenue
+                if fare is not None:
+                    g.priced += 1
+                    g.fare_sum += fare
+        for flight_id, created_at in recent:
+            entry = flights.get(flight_id)
+            if entry and created_at:
+                routes[entry[0]].add_bookings(self._hour(created_at))
+                airlines[entry[1]].add_bookings(self._hour(created_at))
+        with self._lock:
+            self._routes, self._airlines, self._flights = routes, airlines, flights
+
+    def routes(self, origin=None, destination=None, day=None):
+        hour = self._hour()
+        with self._lock:
+            return [
+                dict(origin=o, destination=d, day=dy, **g.as_dict(hour))
+                for (o, d, dy), g in self._routes.items()
+                if (origin is None or o == origin) and (destination is None or d == destination) and (day is None or dy == day)
+            ]
+
+    def airlines(self, airline_name=None, day=None):
+        hour = self._hour()
+        with self._lock:
+            return [
+                dict(airline_name=a, day=dy, **g.as_dict(hour))
+                for (a, dy), g in self._airlines.items()
+                if (airline_name is None or a == airline_name) and (day is None or dy == day)
+            ]
+
+route_analytics = RouteAnalytics()
+
+def reconcile_route_analytics():
+    db = SessionLocal()
+    try:
+        route_analytics.reconcile(db)
+    finally:
+        db.close()
+
+# Hot read path: a Core select of just the FlightOutSchema columns, serialized straight from
+# the row tuples. Skips ORM identity-map bookkeeping and per-row Pydantic models.
+FLIGHT_OUT_COLUMNS = (
+    Flight.Flight_no, Flight.origin, Flight.destination, Flight.departure, Flight.arrival,
+    Flight.base_fare, Flight.total_seats, Flight.seats_available, Flight.airline_name,
+)
+
+def flight_out(row, now=None) -> dict:
+    flight_no, origin, destination, departure, arrival, base_fare, total_seats, seats_available, airline_name = row
+    base_fare = float(base_fare)
+    return {
+        "Flight_no": flight_no,
+        "origin": origin,
+        "destination": destination,
+        "departure": departure.isoformat() if departure else None,
+        "arrival": arrival.isoformat() if arrival else None,
+        "base_fare": base_fare,
+        "total_seats": total_seats,
+        "seats_available": seats_available,
+        "airline_name": airline_name,
+        "dynamic_price": calculate_dynamic_price(base_fare, seats_available or 0, total_seats or 1, departure, airline_name or "", now=now),
+    }
+
+def json_response(content) -> Response:
+    return Response(json.dumps(content, separators=(",", ":")), media_type="application/json")
+
 @app.get("/flights", response_model=List[FlightOutSchema])
 @app.get("/flights/", response_model=List[FlightOutSchema])
 def list_flights(db: Session = Depends(get_db)):
-    flights = db.query(Flight).all()
-    out = []
-    for f in flights:
-        dp = calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "")
-        out.append(FlightOutSchema(
-            Flight_no=f.Flight_no,
-            origin=f.origin,
-            destination=f.destination,
-            departure=f.departure,
-            arrival=f.arrival,
-            base_fare=float(f.base_fare),
-            total_seats=f.total_seats,
-            seats_available=f.seats_available,
-            airline_name=f.airline_name,
-            dynamic_price=dp
-        ))
-    return out
+    now = datetime.utcnow()
+    return json_response([flight_out(row, now) for row in db.execute(select(*FLIGHT_OUT_COLUMNS))])
 
 @app.get("/pricing/{flight_no}", response_model=FlightOutSchema)
 def get_pricing(flight_no: str, db: Session = Depends(get_db)):
-    f = db.query(Flight).filter(Flight.Flight_no==flight_no).first()
-    if not f:
+    row = db.execute(select(*FLIGHT_OUT_COLUMNS).where(Flight.Flight_no==flight_no)).first()
+    if not row:
         raise HTTPException(404,"Flight not found")
-    dp = calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "")
-    return FlightOutSchema(
-        Flight_no=f.Flight_no,
-        origin=f.origin,
-        destination=f.destination,
-        departure=f.departure,
-        arrival=f.arrival,
-        base_fare=float(f.base_fare),
-        total_seats=f.total_seats,
-        seats_available=f.seats_available,
-        airline_name=f.airline_name,
-        dynamic_price=dp
-    )
+    return json_response(flight_out(row))
 
 @app.post("/booking/reserve", response_model=BookingReserveOut)
 def reserve_booking(payload: BookingCreate, db: Session = Depends(get_db)):
@@ -241,7 +958,8 @@ def reserve_booking(payload: BookingCreate, db: Session = Depends(get_db)):
             raise HTTPException(404,"Flight not found")
         if not flight.total_seats or not (1 <= payload.seat_no <= flight.total_seats):
             raise HTTPException(400,"Invalid seat")
-        existing = db.query(Booking).filter(Booking.flight_id==payload.flight_id, Booking.seat_no==payload.seat_no, Booking.status!="Cancelled").first()
+        existing = db.query(Booking).filter(Booking.flight_id==payload.flight_id, Booking.seat_no==payload.seat_no,
+                                            Booking.status.notin_(SEAT_RELEASED_STATUSES)).first()
         if existing:
             raise HTTPException(400,"Seat already booked")
         if flight.seats_available is None:
@@ -260,6 +978,7 @@ def reserve_booking(payload: BookingCreate, db: Session = Depends(get_db)):
         )
         db.add(booking)
         db.commit()
+        route_analytics.record(payload.flight_id, seats_sold=1, bookings=1)
         db.refresh(booking)
         return BookingReserveOut(
             pnr=booking.pnr, flight_id=booking.flight_id, flight_no=booking.flight_no,
@@ -272,8 +991,8 @@ def reserve_booking(payload: BookingCreate, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(500,f"Reservation failed: {e}")
 
-@app.post("/bookings/pay/{pnr}")
-def simulate_payment(pnr: str, db: Session = Depends(get_db)):
+@app.post("/bookings/pay/{pnr}", status_code=202)
+def simulate_payment(pnr: str, payment_mode: str = "UPI", db: Session = Depends(get_db)):
     try:
         booking = db.query(Booking).filter(Booking.pnr==pnr).with_for_update().first()
         if not booking:
@@ -282,19 +1001,27 @@ def simulate_payment(pnr: str, db: Session = Depends(get_db)):
             return {"message": f"Booking {pnr} already confirmed","status":booking.status,"pnr":booking.pnr}
         if booking.status=="Cancelled":
             raise HTTPException(400,"Booking cancelled")
-        flight = db.query(Flight).filter(Flight.Flight_id==booking.flight_id).with_for_update().first()
-        payment_success = random.choice([True, False, True])
-        if payment_success:
-            booking.status="Confirmed"
-            booking.trans_id = booking.trans_id or generate_trans_id()
-            db.commit()
-            return {"message": f"Payment successful for booking {pnr}", "status": booking.status, "pnr": booking.pnr}
-        else:
-            booking.status="Payment Failed"
-            if flight:
-                flight.seats_available = min(flight.total_seats or 0, (flight.seats_available or 0)+1)
-            db.commit()
-            return {"message": f"Payment failed for booking {pnr}", "status": booking.status}
+        if booking.status=="Payment Failed":
+            raise HTTPException(400,"Payment failed and the seat was released; reserve again")
+        if payment_mode not in PAYMENT_MODES:
+            raise HTTPException(400,f"payment_mode must be one of {', '.join(PAYMENT_MODES)}")
+        payment = None
+        if booking.status=="Payment Pending":
+            payment = db.query(Payment).filter(Payment.booking_id==booking.booking_id, Payment.payment_status=="Pending").first()
+        submit = payment is None
+        if submit:
+            payment = Payment(booking_id=booking.booking_id, amount=booking.price, payment_mode=payment_mode, payment_status="Pending")
+            db.add(payment)
+            booking.status = "Payment Pending"
+            db.flush()
+        payment_id = payment.payment_id
+        db.commit()
+        if submit:
+            submit_payment(payment_id)
+        return {
+            "message": f"Payment for booking {pnr} is being processed", "status": "Payment Pending", "pnr": pnr,
+            "payment_id": payment_id, "status_url": f"/payments/{payment_id}"
+        }
     except HTTPException:
         db.rollback()
         raise
@@ -302,6 +1029,31 @@ def simulate_payment(pnr: str, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(500,f"Payment simulation failed: {e}")
 
+def get_payment_status(payment_id: int):
+    db = SessionLocal()
+    try:
+        row = db.query(Payment, Booking.pnr, Booking.status).outerjoin(Booking, Payment.booking_id==Booking.booking_id).filter(
+            Payment.payment_id==payment_id).first()
+        if not row:
+            raise HTTPException(404,"Payment not found")
+        payment, pnr, booking_status = row
+        return PaymentStatusOut(
+            payment_id=payment.payment_id, pnr=pnr, amount=float(payment.amount) if payment.amount is not None else None,
+            payment_mode=payment.payment_mode, payment_status=payment.payment_status, booking_status=booking_status,
+            payment_date=payment.payment_date
+        )
+    finally:
+        db.close()
+
+@app.get("/payments/{payment_id}", response_model=PaymentStatusOut)
+async def payment_status(payment_id: int, wait: float = 0):
+    """Poll a payment; with ``wait`` > 0, block up to that many seconds until it settles."""
+    event = _payment_events.get(payment_id)
+    deadline = time.monotonic() + min(max(wait, 0), PAYMENT_MAX_WAIT)
+    while event is not None and not event.is_set() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return await run_in_threadpool(get_payment_status, payment_id)
+
 @app.delete("/bookings/cancel/{pnr}")
 def cancel_booking(pnr: str, db: Session = Depends(get_db)):
     try:
@@ -310,11 +1062,25 @@ def cancel_booking(pnr: str, db: Session = Depends(get_db)):
             raise HTTPException(404,"Booking not found")
         if booking.status=="Cancelled":
             return {"message": f"Booking {pnr} already cancelled"}
-        flight = db.query(Flight).filter(Flight.Flight_id==booking.flight_id).with_for_update().first()
-        if flight:
-            flight.seats_available = min(flight.total_seats or 0, (flight.seats_available or 0)+1)
+        released = {}
+        if booking.status!="Payment Failed":
+            flight = db.query(Flight).filter(Flight.Flight_id==booking.flight_id).with_for_update().first()
+            if flight:
+                flight.seats_available = min(flight.total_seats or 0, (flight.seats_available or 0)+1)
+                released["seats_sold"] = -1
+        refunds = []
+        if booking.status=="Confirmed":
+            released.update(confirmed=-1, revenue=-float(booking.price or 0))
+            for payment in db.query(Payment).filter(Payment.booking_id==booking.booking_id, Payment.payment_status=="Success").with_for_update():
+                payment.payment_status = "Refunding"
+                refunds.append(payment.payment_id)
         booking.status="Cancelled"
+        flight_id = booking.flight_id
         db.commit()
+        if released:
+            route_analytics.record(flight_id, **released)
+        for payment_id in refunds:
+            payment_executor.submit(refund_payment, payment_id)
         return {"message": f"Booking {pnr} cancelled","pnr":booking.pnr,"flight_id":booking.flight_id}
     except HTTPException:
         db.rollback()
@@ -328,6 +1094,37 @@ def fare_history(flight_no: str, limit: int = 10, db: Session = Depends(get_db))
     rows = db.query(FareHistory).filter(FareHistory.flight_no==flight_no).order_by(FareHistory.timestamp.desc()).limit(limit).all()
     return [{"timestamp":r.timestamp,"fare":float(r.fare)} for r in rows]
 
+@app.get("/airports/suggest", response_model=List[AirportSuggestionOut])
+def suggest_airports(q: str = "", limit: int = 10):
+    return airport_index.suggest(q, max(1, min(limit, 50)))
+
+@app.post("/admin/flights/import")
+async def import_flights(request: Request, fmt: Optional[str] = Query(None, alias="format"), batch_size: int = FLIGHT_IMPORT_BATCH_SIZE):
+    fmt = fmt or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(400, "format must be csv or ndjson")
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            return await run_in_threadpool(import_flight_schedule, stream, fmt, max(1, batch_size))
+        finally:
+            stream.detach()
+
+@app.get("/analytics/routes", response_model=List[RouteStatsOut])
+def route_stats(origin: Optional[str] = None, destination: Optional[str] = None, day: Optional[str] = None):
+    rows = route_analytics.routes(origin, destination, day)
+    rows.sort(key=lambda r: (r["day"] or "", r["origin"] or "", r["destination"] or ""))
+    return json_response(rows)
+
+@app.get("/analytics/airlines", response_model=List[AirlineStatsOut])
+def airline_stats(airline: Optional[str] = None, day: Optional[str] = None):
+    rows = route_analytics.airlines(airline, day)
+    rows.sort(key=lambda r: (r["day"] or "", r["airline_name"] or ""))
+    return json_response(rows)
+
 @app.get("/health")
 def health_check():
     return {"status":"running","time":datetime.utcnow()}
@@ -336,32 +1133,59 @@ def health_check():
 def root():
     return {"message":"Flight Booking API running"}
 
+def run_pricing_tick():
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        fares = []
+        for f in db.query(Flight).all():
+            dp = calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "", now=now)
+            fares.append((f.Flight_id, dp))
+            db.add(DynamicPricing(
+                flight_id=f.Flight_id,
+                demand_factor=decimal.Decimal(str(random.uniform(0,0.3))),
+                time_factor=decimal.Decimal(str(random.uniform(0,0.3))),
+                seat_factor=decimal.Decimal(str(random.uniform(0,0.3))),
+                final_fare=decimal.Decimal(str(dp))
+            ))
+        db.commit()
+        route_analytics.record_fares(fares)
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
 async def dynamic_pricing_updater():
     while True:
-        async with asyncio.Lock():
-            db = SessionLocal()
-            try:
-                flights = db.query(Flight).all()
-                for f in flights:
-                    dp = calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "")
-                    entry = DynamicPricing(
-                        flight_id=f.Flight_id,
-                        demand_factor=decimal.Decimal(str(random.uniform(0,0.3))),
-                        time_factor=decimal.Decimal(str(random.uniform(0,0.3))),
-                        seat_factor=decimal.Decimal(str(random.uniform(0,0.3))),
-                        final_fare=decimal.Decimal(str(dp))
-                    )
-                    db.add(entry)
-                    db.commit()
-            except Exception:
-                db.rollback()
-            finally:
-                db.close()
+        await run_in_threadpool(run_pricing_tick)
         await asyncio.sleep(30)
 
+async def route_analytics_reconciler():
+    while True:
+        await asyncio.sleep(ANALYTICS_RECONCILE_INTERVAL)
+        try:
+            await run_in_threadpool(reconcile_route_analytics)
+        except Exception:
+            pass
+
 @app.on_event("startup")
 async def start_background_tasks():
+    db = SessionLocal()
+    try:
+        load_airport_index(db)
+        route_analytics.reconcile(db)
+    finally:
+        db.close()
+    resume_pending_payments()
     asyncio.create_task(dynamic_pricing_updater())
+    asyncio.create_task(route_analytics_reconciler())
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    # Queued payments stay Pending in the database and are resumed on the next startup.
+    global payment_executor
+    payment_executor.shutdown(wait=False, cancel_futures=True)
+    payment_executor = ThreadPoolExecutor(max_workers=PAYMENT_WORKERS, thread_name_prefix="payment")
 
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -372,342 +1196,3 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 @app.get("/")
 def serve_index():
     return FileResponse(os.path.join("static", "index.html"))
-=======
-from fastapi import FastAPI, HTTPException, Depends
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, DECIMAL, ForeignKey
-from sqlalchemy.orm import sessionmaker, declarative_base, Session, relationship
-from pydantic import BaseModel
-from datetime import datetime, timedelta
-import random, decimal, uuid, string, asyncio
-from typing import List, Optional
-
-MYSQL_USER = "root"
-MYSQL_PASSWORD = "2464"
-MYSQL_HOST = "localhost"
-MYSQL_DB = "FlightS_booking"
-
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}"
-engine = create_engine(DATABASE_URL, echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-Base = declarative_base()
-
-class Airport(Base):
-    __tablename__ = "airports"
-    airport_id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(100), nullable=False)
-    city = Column(String(50), nullable=False)
-    country = Column(String(50), nullable=False)
-    iata_code = Column(String(3), unique=True, nullable=False)
-
-class Airline(Base):
-    __tablename__ = "airline"
-    airline_id = Column(Integer, primary_key=True, autoincrement=True)
-    airline_name = Column(String(100), nullable=False)
-    contact_email = Column(String(100))
-    contact_number = Column(String(15))
-
-class Flight(Base):
-    __tablename__ = "Flight"
-    Flight_id = Column(Integer, primary_key=True, autoincrement=True)
-    Flight_no = Column(String(10), unique=True, nullable=False)
-    airline_id = Column(Integer, ForeignKey("airline.airline_id"))
-    origin = Column(String(50))
-    destination = Column(String(50))
-    departure = Column(DateTime)
-    arrival = Column(DateTime)
-    base_fare = Column(DECIMAL(10,2), default=5000.0)
-    total_seats = Column(Integer)
-    seats_available = Column(Integer)
-    airline_name = Column(String(50))
-    flight_status = Column(String(10), default="On Time")
-    airline = relationship("Airline")
-
-class Passenger(Base):
-    __tablename__ = "passengers"
-    passenger_id = Column(Integer, primary_key=True, autoincrement=True)
-    full_name = Column(String(100), nullable=False)
-    contact_number = Column(String(20))
-    email = Column(String(100))
-    city = Column(String(50))
-
-class Booking(Base):
-    __tablename__ = "bookings"
-    booking_id = Column(Integer, primary_key=True, autoincrement=True)
-    trans_id = Column(String(50))
-    flight_no = Column(String(10), ForeignKey("Flight.Flight_no"))
-    flight_id = Column(Integer, ForeignKey("Flight.Flight_id"))
-    passenger_fullname = Column(String(100), nullable=False)
-    passenger_contact = Column(String(20))
-    seat_no = Column(Integer)
-    pnr = Column(String(16), unique=True)
-    status = Column(String(30), default="Pending")
-    price = Column(DECIMAL(12,2))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    flight = relationship("Flight")
-
-class FareHistory(Base):
-    __tablename__ = "fare_history"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    flight_no = Column(String(10))
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    fare = Column(DECIMAL(20,2))
-
-class User(Base):
-    __tablename__ = "user"
-    user_id = Column(Integer, primary_key=True, autoincrement=True)
-    full_name = Column(String(100))
-    email = Column(String(100), unique=True)
-    password = Column(String(255))
-    phone = Column(String(15))
-    role = Column(String(10), default="User")
-
-class DynamicPricing(Base):
-    __tablename__ = "dynamic_pricing"
-    pricing_id = Column(Integer, primary_key=True, autoincrement=True)
-    flight_id = Column(Integer, ForeignKey("Flight.Flight_id"))
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    demand_factor = Column(DECIMAL(5,2))
-    time_factor = Column(DECIMAL(5,2))
-    seat_factor = Column(DECIMAL(5,2))
-    final_fare = Column(DECIMAL(10,2))
-    flight = relationship("Flight")
-
-class Payment(Base):
-    __tablename__ = "payment"
-    payment_id = Column(Integer, primary_key=True, autoincrement=True)
-    booking_id = Column(Integer, ForeignKey("bookings.booking_id"))
-    payment_date = Column(DateTime, default=datetime.utcnow)
-    amount = Column(DECIMAL(10,2))
-    payment_mode = Column(String(20))
-    payment_status = Column(String(10), default="Success")
-    booking = relationship("Booking")
-
-Base.metadata.create_all(engine)
-
-class FlightOutSchema(BaseModel):
-    Flight_no: str
-    origin: str
-    destination: str
-    departure: datetime
-    arrival: datetime
-    base_fare: float
-    total_seats: int
-    seats_available: int
-    airline_name: str
-    dynamic_price: float
-    class Config:
-        orm_mode = True
-
-class BookingCreate(BaseModel):
-    flight_id: int
-    seat_no: int
-    passenger_fullname: str
-    passenger_contact: Optional[str] = None
-    trans_id: Optional[str] = None
-
-class BookingReserveOut(BaseModel):
-    pnr: str
-    flight_id: int
-    flight_no: str
-    seat_no: int
-    status: str
-    message: str
-
-class BookingOutSchema(BaseModel):
-    trans_id: Optional[str]
-    flight_no: str
-    passenger_fullname: str
-    passenger_contact: Optional[str]
-    seat_no: int
-    origin: Optional[str]
-    destination: Optional[str]
-    pnr: Optional[str]
-    status: Optional[str]
-    price: Optional[float]
-    class Config:
-        orm_mode = True
-
-class FareHistoryOutSchema(BaseModel):
-    timestamp: datetime
-    fare: float
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def generate_pnr(length: int = 6) -> str:
-    chars = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
-
-def generate_trans_id() -> str:
-    return str(uuid.uuid4()).replace('-', '')[:20]
-
-def calculate_dynamic_price(base_fare, seats_available, total_seats, departure, airline_name="standard"):
-    base = float(base_fare) if not isinstance(base_fare, float) else base_fare
-    seat_ratio = seats_available / total_seats if total_seats else 0
-    seat_factor = 0.4 * (1 - seat_ratio)
-    days = (departure - datetime.utcnow()).total_seconds() / 86400 if departure else 0
-    time_factor = 0.6 if days <= 0 else 0.4 if days <= 1 else 0.2 if days <= 3 else 0.1 if days <= 7 else -0.05
-    demand_factor = random.uniform(-0.08, 0.25)
-    tier_factor = 0.12 if "premium" in airline_name.lower() or "air india" in airline_name.lower() else -0.03
-    total_multiplier = 1 + seat_factor + time_factor + demand_factor + tier_factor
-    return max(round(base * total_multiplier, 2), 50.0)
-
-app = FastAPI(title="Flight Booking API Full", version="1.5")
-
-@app.get("/flights/", response_model=List[FlightOutSchema])
-def list_flights(db: Session = Depends(get_db)):
-    flights = db.query(Flight).all()
-    out = []
-    for f in flights:
-        dp = calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "")
-        out.append(FlightOutSchema(
-            Flight_no=f.Flight_no,
-            origin=f.origin,
-            destination=f.destination,
-            departure=f.departure,
-            arrival=f.arrival,
-            base_fare=float(f.base_fare),
-            total_seats=f.total_seats,
-            seats_available=f.seats_available,
-            airline_name=f.airline_name,
-            dynamic_price=dp
-        ))
-    return out
-
-@app.get("/pricing/{flight_no}", response_model=FlightOutSchema)
-def get_pricing(flight_no: str, db: Session = Depends(get_db)):
-    f = db.query(Flight).filter(Flight.Flight_no==flight_no).first()
-    if not f: raise HTTPException(404,"Flight not found")
-    dp = calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "")
-    return FlightOutSchema(
-        Flight_no=f.Flight_no,
-        origin=f.origin,
-        destination=f.destination,
-        departure=f.departure,
-        arrival=f.arrival,
-        base_fare=float(f.base_fare),
-        total_seats=f.total_seats,
-        seats_available=f.seats_available,
-        airline_name=f.airline_name,
-        dynamic_price=dp
-    )
-
-@app.post("/booking/reserve", response_model=BookingReserveOut)
-def reserve_booking(payload: BookingCreate, db: Session = Depends(get_db)):
-    try:
-        flight = db.query(Flight).filter(Flight.Flight_id == payload.flight_id).with_for_update().first()
-        if not flight: raise HTTPException(404,"Flight not found")
-        if not flight.total_seats or not (1 <= payload.seat_no <= flight.total_seats): raise HTTPException(400,"Invalid seat")
-        existing = db.query(Booking).filter(Booking.flight_id==payload.flight_id, Booking.seat_no==payload.seat_no, Booking.status!="Cancelled").first()
-        if existing: raise HTTPException(400,"Seat already booked")
-        if flight.seats_available is None: flight.seats_available = max(0, flight.total_seats-1)
-        elif flight.seats_available <= 0: raise HTTPException(400,"No seats available")
-        flight.seats_available = max(0, flight.seats_available - 1)
-        db.flush()
-        pnr = generate_pnr()
-        trans_id = payload.trans_id or generate_trans_id()
-        price_val = calculate_dynamic_price(flight.base_fare, flight.seats_available, flight.total_seats or 1, flight.departure, flight.airline_name or "")
-        booking = Booking(
-            trans_id=trans_id, flight_no=flight.Flight_no, flight_id=flight.Flight_id,
-            passenger_fullname=payload.passenger_fullname, passenger_contact=payload.passenger_contact,
-            seat_no=payload.seat_no, pnr=pnr, status="Reserved", price=decimal.Decimal(str(price_val))
-        )
-        db.add(booking)
-        db.commit()
-        db.refresh(booking)
-        return BookingReserveOut(
-            pnr=booking.pnr, flight_id=booking.flight_id, flight_no=booking.flight_no,
-            seat_no=booking.seat_no, status=booking.status, message="Seat reserved. Proceed to payment using the PNR."
-        )
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(500,f"Reservation failed: {e}")
-
-@app.post("/bookings/pay/{pnr}")
-def simulate_payment(pnr: str, db: Session = Depends(get_db)):
-    try:
-        booking = db.query(Booking).filter(Booking.pnr==pnr).with_for_update().first()
-        if not booking: raise HTTPException(404,"Booking not found")
-        if booking.status=="Confirmed": return {"message": f"Booking {pnr} already confirmed","status":booking.status,"pnr":booking.pnr}
-        if booking.status=="Cancelled": raise HTTPException(400,"Booking cancelled")
-        flight = db.query(Flight).filter(Flight.Flight_id==booking.flight_id).with_for_update().first()
-        payment_success = random.choice([True, False, True])
-        if payment_success:
-            booking.status="Confirmed"
-            booking.trans_id = booking.trans_id or generate_trans_id()
-            db.commit()
-            return {"message": f"Payment successful for booking {pnr}", "status": booking.status, "pnr": booking.pnr}
-        else:
-            booking.status="Payment Failed"
-            if flight: flight.seats_available = min(flight.total_seats or 0, (flight.seats_available or 0)+1)
-            db.commit()
-            return {"message": f"Payment failed for booking {pnr}", "status": booking.status}
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(500,f"Payment simulation failed: {e}")
-
-@app.delete("/bookings/cancel/{pnr}")
-def cancel_booking(pnr: str, db: Session = Depends(get_db)):
-    try:
-        booking = db.query(Booking).filter(Booking.pnr==pnr).with_for_update().first()
-        if not booking: raise HTTPException(404,"Booking not found")
-        if booking.status=="Cancelled": return {"message": f"Booking {pnr} already cancelled"}
-        flight = db.query(Flight).filter(Flight.Flight_id==booking.flight_id).with_for_update().first()
-        if flight: flight.seats_available = min(flight.total_seats or 0, (flight.seats_available or 0)+1)
-        booking.status="Cancelled"
-        db.commit()
-        return {"message": f"Booking {pnr} cancelled","pnr":booking.pnr,"flight_id":booking.flight_id}
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(500,f"Cancellation failed: {e}")
-
-@app.get("/fare-history/{flight_no}", response_model=List[FareHistoryOutSchema])
-def fare_history(flight_no: str, limit: int = 10, db: Session = Depends(get_db)):
-    rows = db.query(FareHistory).filter(FareHistory.flight_no==flight_no).order_by(FareHistory.timestamp.desc()).limit(limit).all()
-    return [{"timestamp":r.timestamp,"fare":float(r.fare)} for r in rows]
-
-@app.get("/health")
-def health_check():
-    return {"status":"running","time":datetime.utcnow()}
-
-@app.get("/")
-def root():
-    return {"message":"Flight Booking API running"}
-
-async def dynamic_pricing_updater():
-    while True:
-        async with asyncio.Lock():
-            db = SessionLocal()
-            try:
-                flights = db.query(Flight).all()
-                for f in flights:
-                    dp = calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "")
-                    entry = DynamicPricing(flight_id=f.Flight_id, demand_factor=decimal.Decimal(str(random.uniform(0,0.3))),
-                                           time_factor=decimal.Decimal(str(random.uniform(0,0.3))),
-                                           seat_factor=decimal.Decimal(str(random.uniform(0,0.3))),
-                                           final_fare=decimal.Decimal(str(dp)))
-                    db.add(entry)
-                    db.commit()
-            except Exception as e:
-                db.rollback()
-            finally:
-                db.close()
-        await asyncio.sleep(30)  
-
-@app.on_event("startup")
-async def start_background_tasks():
-    asyncio.create_task(dynamic_pricing_updater())
->>>>>>> ed95e1d5e990de39e8f9930d16db03f24fbe5220
@@ -0,0 +1,258 @@
+"""Offline backtesting of pricing policies against stored booking history.
+
+Booking curves are loaded from ``bookings``/``dynamic_pricing`` into NumPy arrays
+and replayed day by day under many candidate policies at once. Each replay step
+prices every (policy, flight, draw) cell with the same formula as
+``pricing.calculate_dynamic_price``, scales the historical booking rate by a
+constant price elasticity against the fare customers actually saw, and samples
+Poisson demand capped by the seats left.
+
+    python backtest.py --policies 1000 --draws 100 --workers 8 --out sweep.json
+    python backtest.py --synthetic 500 --policies 200      # no database needed
+    python backtest.py --policies-file candidates.json --from 2025-06-01 --to 2025-09-01
+
+NumPy is only needed for this module, not for the API.
+"""
+import argparse, json, math, os, sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from pricing import MIN_FARE, PRICING_POLICY as BASELINE_POLICY, TIME_BUCKET_DAYS, is_premium_airline
+
+# Column order of the (n_policies, 10) matrix the replay works on.
+POLICY_COLUMNS = ("seat_weight", "t0", "t1", "t2", "t3", "t_far", "demand_lo", "demand_hi", "premium_tier", "standard_tier")
+CELLS_PER_CHUNK = 1_000_000
+
+
+def policy_to_vector(policy):
+    policy = dict(BASELINE_POLICY, **policy)
+    lo, hi = policy["demand_range"]
+    return [policy["seat_weight"], *policy["time_factors"], lo, hi, policy["premium_tier"], policy["standard_tier"]]
+
+
+def vector_to_policy(vector):
+    v = [round(float(x), 4) for x in vector]
+    return {"seat_weight": v[0], "time_factors": tuple(v[1:6]), "demand_range": (v[6], v[7]),
+            "premium_tier": v[8], "standard_tier": v[9]}
+
+
+def load_history(horizon=60, departure_from=None, departure_to=None):
+    """Read flights and their booking curves from the booking database.
+
+    Returns a dict of arrays: ``base_fare``, ``total_seats``, ``premium`` (per
+    flight), ``ref_fare`` (average price paid, else average quoted dynamic fare,
+    else base fare) and ``rate`` (bookings per flight per day before departure,
+    shape ``(flights, horizon + 1)``).
+    """
+    from sqlalchemy import func, select
+    from backend import Booking, DynamicPricing, Flight, engine
+
+    flight_filter = [Flight.departure.isnot(None)]
+    if departure_from:
+        flight_filter.append(Flight.departure >= departure_from)
+    if departure_to:
+        flight_filter.append(Flight.departure < departure_to)
+    with engine.connect() as conn:
+        flights = conn.execute(
+            select(Flight.Flight_id, Flight.base_fare, Flight.total_seats, Flight.departure, Flight.airline_name)
+            .where(*flight_filter).order_by(Flight.Flight_id)
+        ).all()
+        index = {f.Flight_id: i for i, f in enumerate(flights)}
+        departures = [f.departure for f in flights]
+        rate = np.zeros((len(flights), horizon + 1))
+        paid_sum, paid_count = np.zeros(len(flights)), np.zeros(len(flights))
+        for flight_id, created_at, price in conn.execute(
+            select(Booking.flight_id, Booking.created_at, Booking.price).join(Flight, Booking.flight_id == Flight.Flight_id)
+            .where(*flight_filter)
+        ):
+            i = index[flight_id]
+            if created_at is not None:
+                days = (departures[i] - created_at).total_seconds() / 86400
+                rate[i, min(max(math.ceil(days), 0), horizon)] += 1
+            if price is not None:
+                paid_sum[i] += float(price)
+                paid_count[i] += 1
+        quoted = np.zeros(len(flights))
+        for flight_id, avg_fare in conn.execute(
+            select(DynamicPricing.flight_id, func.avg(DynamicPricing.final_fare)).join(Flight, DynamicPricing.flight_id == Flight.Flight_id)
+            .where(*flight_filter).group_by(DynamicPricing.flight_id)
+        ):
+            quoted[index[flight_id]] = float(avg_fare or 0)
+    base_fare = np.array([float(f.base_fare or 0) for f in flights])
+    ref_fare = np.where(paid_count > 0, paid_sum / np.maximum(paid_count, 1), np.where(quoted > 0, quoted, base_fare))
+    return {
+        "base_fare": base_fare,
+        "total_seats": np.array([f.total_seats or 0 for f in flights], dtype=float),
+        "premium": np.array([is_premium_airline(f.airline_name) for f in flights]),
+        "ref_fare": np.maximum(ref_fare, MIN_FARE),
+        "rate": rate,
+    }
+
+
+def synthetic_history(n_flights=500, horizon=60, seed=0):
+    """A made-up season with demand ramping up towards departure, for trying the engine without a database."""
+    rng = np.random.default_rng(seed)
+    base_fare = rng.uniform(3000, 9000, n_flights).round(2)
+    total_seats = rng.choice([120, 150, 180, 220], n_flights).astype(float)
+    days = np.arange(horizon + 1)
+    curve = np.exp(-days / rng.uniform(8, 20, (n_flights, 1)))
+    rate = curve / curve.sum(axis=1, keepdims=True) * total_seats[:, None] * rng.uniform(0.6, 1.1, (n_flights, 1))
+    return {
+        "base_fare": base_fare,
+        "total_seats": total_seats,
+        "premium": rng.random(n_flights) < 0.3,
+        "ref_fare": base_fare * 1.25,
+        "rate": rate,
+    }
+
+
+def simulate(history, policies, draws=100, elasticity=1.2, seed=0):
+    """Replay ``history`` under every row of ``policies``.
+
+    ``policies`` is an ``(n_policies, len(POLICY_COLUMNS))`` matrix. Returns
+    season revenue and load factor per policy and Monte-Carlo draw, each of
+    shape ``(n_policies, draws)``.
+    """
+    rng = np.random.default_rng(seed)
+    p = np.asarray(policies, dtype=float)
+    n_policies, n_flights = p.shape[0], history["base_fare"].shape[0]
+    col = {name: p[:, i, None, None] for i, name in enumerate(POLICY_COLUMNS)}
+    tier = np.where(history["premium"][None, :, None], col["premium_tier"], col["standard_tier"])
+    noise_width = col["demand_hi"] - col["demand_lo"]
+    base = history["base_fare"][None, :, None]
+    total = np.maximum(history["total_seats"], 1)[None, :, None]
+    ref = history["ref_fare"][None, :, None]
+    rate = history["rate"]
+
+    shape = (n_policies, n_flights, draws)
+    seats_left = np.broadcast_to(history["total_seats"][None, :, None], shape).copy()
+    revenue = np.zeros(shape)
+    for day in range(rate.shape[1] - 1, -1, -1):
+        day_rate = rate[:, day]
+        if not day_rate.any():
+            continue
+        bucket = 1 + int(np.searchsorted(TIME_BUCKET_DAYS, day, side="left"))
+        fixed = 1 + p[:, bucket, None, None] + col["demand_lo"] + tier
+        # fare = base * (1 + seat_weight * load + time + noise + tier), built in place.
+        fare = np.divide(seats_left, total)
+        np.subtract(1, fare, out=fare)
+        fare *= col["seat_weight"]
+        fare += rng.random(shape) * noise_width
+        fare += fixed
+        fare *= base
+        np.maximum(fare, MIN_FARE, out=fare)
+        expected = np.divide(fare, ref)
+        expected **= -elasticity
+        expected *= day_rate[None, :, None]
+        sold = np.minimum(rng.poisson(expected), seats_left)
+        seats_left -= sold
+        sold *= fare
+        revenue += sold
+    sold_total = (history["total_seats"][None, :, None] - seats_left).sum(axis=1)
+    return revenue.sum(axis=1), sold_total / max(history["total_seats"].sum(), 1)
+
+
+_worker_history = None
+
+
+def _init_worker(history):
+    global _worker_history
+    _worker_history = history
+
+
+def _simulate_chunk(args):
+    policies, draws, elasticity, seed = args
+    return simulate(_worker_history, policies, draws, elasticity, seed)
+
+
+def _distribution(values):
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {"mean": float(values.mean()), "std": float(values.std()), "p5": float(p5), "p50": float(p50), "p95": float(p95)}
+
+
+def run_sweep(history, policies, draws=100, elasticity=1.2, seed=0, workers=None):
+    """Backtest a list of policy dicts, splitting large sweeps across processes.
+
+    Results come back in the input order and do not depend on ``workers``: each
+    chunk of policies gets its own seed from ``seed``.
+    """
+    matrix = np.array([policy_to_vector(p) for p in policies], dtype=float)
+    n_flights = history["base_fare"].shape[0]
+    chunk = max(1, CELLS_PER_CHUNK // max(n_flights * draws, 1))
+    chunks = [matrix[i:i + chunk] for i in range(0, len(matrix), chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(c, draws, elasticity, s) for c, s in zip(chunks, seeds)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker, initargs=(history,)) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    else:
+        results = [simulate(history, c, draws, elasticity, s) for c, _, _, s in tasks]
+    revenue = np.concatenate([r for r, _ in results])
+    load_factor = np.concatenate([lf for _, lf in results])
+    return [
+        {"policy": vector_to_policy(matrix[i]), "revenue": _distribution(revenue[i]), "load_factor": _distribution(load_factor[i])}
+        for i in range(len(matrix))
+    ]
+
+
+def random_policies(n, spread=0.25, seed=0):
+    """The baseline policy followed by ``n - 1`` random perturbations of up to ``spread`` per parameter."""
+    rng = np.random.default_rng(seed)
+    baseline = np.array(policy_to_vector(BASELINE_POLICY))
+    vectors = baseline * (1 + rng.uniform(-spread, spread, (max(n, 1), baseline.size)))
+    vectors[0] = baseline
+    vectors[:, 6:8] = np.sort(vectors[:, 6:8], axis=1)
+    return [vector_to_policy(v) for v in vectors]
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest pricing policies against booking history.")
+    parser.add_argument("--policies", type=int, default=100, help="number of random policies around the baseline")
+    parser.add_argument("--policies-file", help="JSON list of policy dicts (missing keys fall back to the baseline)")
+    parser.add_argument("--spread", type=float, default=0.25)
+    parser.add_argument("--draws", type=int, default=100)
+    parser.add_argument("--elasticity", type=float, default=1.2)
+    parser.add_argument("--horizon", type=int, default=60, help="days before departure to replay")
+    parser.add_argument("--from", dest="departure_from", type=_parse_date)
+    parser.add_argument("--to", dest="departure_to", type=_parse_date)
+    parser.add_argument("--synthetic", type=int, metavar="FLIGHTS", help="use a generated season instead of the database")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the full results here as JSON")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        history = synthetic_history(args.synthetic, args.horizon, args.seed)
+    else:
+        history = load_history(args.horizon, args.departure_from, args.departure_to)
+    if args.policies_file:
+        with open(args.policies_file) as fh:
+            policies = json.load(fh)
+    else:
+        policies = random_policies(args.policies, args.spread, args.seed)
+
+    results = run_sweep(history, policies, args.draws, args.elasticity, args.seed, args.workers)
+    report = {
+        "flights": int(history["base_fare"].shape[0]),
+        "draws": args.draws,
+        "elasticity": args.elasticity,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+    best = sorted(results, key=lambda r: r["revenue"]["mean"], reverse=True)[:5]
+    for r in best:
+        print(f"revenue {r['revenue']['mean']:>16,.0f}  load {r['load_factor']['mean']:.3f}  {json.dumps(r['policy'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Micro-benchmark for the /flights read path: per-row cost and peak memory.
+
+Seeds a throwaway SQLite database with N flights, then times the ORM + Pydantic
+listing the endpoint used to do against the Core-row path it uses now, both
+ending in JSON bytes.
+
+    python benchmarks/bench_flight_listing.py --flights 50000
+"""
+import argparse, json, os, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_flights(backend, n):
+    now = datetime.utcnow()
+    rows = [
+        {"Flight_no": f"BF{i}", "origin": "Delhi", "destination": "Mumbai", "departure": now + timedelta(hours=i % 2000),
+         "arrival": now + timedelta(hours=i % 2000 + 2), "base_fare": 5000, "total_seats": 180, "seats_available": 180 - i % 180,
+         "airline_name": "Air India" if i % 3 else "IndiGo", "flight_status": "On Time"}
+        for i in range(n)
+    ]
+    with backend.engine.begin() as conn:
+        conn.execute(backend.Flight.__table__.insert(), rows)
+
+
+def orm_listing(backend, db):
+    from fastapi.encoders import jsonable_encoder
+    out = []
+    for f in db.query(backend.Flight).all():
+        dp = backend.calculate_dynamic_price(f.base_fare, f.seats_available or 0, f.total_seats or 1, f.departure, f.airline_name or "")
+        out.append(backend.FlightOutSchema(
+            Flight_no=f.Flight_no, origin=f.origin, destination=f.destination, departure=f.departure, arrival=f.arrival,
+            base_fare=float(f.base_fare), total_seats=f.total_seats, seats_available=f.seats_available,
+            airline_name=f.airline_name, dynamic_price=dp
+        ))
+    return json.dumps(jsonable_encoder(out), separators=(",", ":")).encode()
+
+
+def core_listing(backend, db):
+    return backend.list_flights(db).body
+
+
+def measure(fn, backend, n, repeat):
+    best = None
+    for _ in range(repeat):
+        db = backend.SessionLocal()
+        try:
+            start = time.perf_counter()
+            body = fn(backend, db)
+            elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    db = backend.SessionLocal()
+    try:
+        tracemalloc.start()
+        fn(backend, db)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        db.close()
+    return {"seconds": round(best, 4), "us_per_row": round(best / n * 1e6, 2), "peak_mb": round(peak / 2**20, 1), "bytes": len(body)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flights", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import backend
+
+    seed_flights(backend, args.flights)
+    report = {
+        "flights": args.flights,
+        "orm_pydantic": measure(orm_listing, backend, args.flights, args.repeat),
+        "core_rows": measure(core_listing, backend, args.flights, args.repeat),
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
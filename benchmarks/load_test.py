@@ -0,0 +1,273 @@
+"""Reproducible load test for the booking lifecycle.
+
+Seeds a database with N flights and M passengers, then drives the app in-process
+(httpx over ASGI, no server) with a configurable number of concurrent clients:
+
+* ``browse``      -- GET /flights and GET /pricing/{flight_no}
+* ``contention``  -- every client reserves -> pays -> (sometimes) cancels on one hot flight
+
+A pricing tick runs in the background throughout. Each phase reports throughput
+and p50/p95/p99 latency per endpoint. Afterwards the seat counts are checked:
+no oversell, no leaked seats, a bookable seat number for every free seat, no
+double-booked seat and no payment stuck Pending.
+The report is JSON, so runs can be compared across commits.
+
+    python benchmarks/load_test.py --flights 1000 --passengers 5000 --concurrency 32 --out bench.json
+    python benchmarks/load_test.py --db-url mysql+pymysql://root:pw@localhost/flights_bench
+
+Point ``--db-url`` at a scratch database: the run seeds it and leaves the data behind.
+"""
+import argparse, asyncio, json, os, platform, random, subprocess, sys, tempfile, time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CITIES = ("Delhi", "Mumbai", "Chennai", "Bangalore", "Kolkata", "Hyderabad", "Pune", "Goa", "Jaipur", "Kochi")
+AIRLINES = ("Air India", "IndiGo", "SpiceJet", "Air India Premium")
+LIVE_STATUSES = ("Reserved", "Payment Pending", "Confirmed")
+HOT_FLIGHT_NO = "LT-HOT"
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, endpoint, seconds, status):
+        self.samples.setdefault(endpoint, []).append((seconds, status))
+
+    def report(self, elapsed):
+        out = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = sorted(s for s, _ in samples)
+            pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3)
+            out[endpoint] = {
+                "count": len(samples),
+                "errors": sum(1 for _, status in samples if status >= 500),
+                "rejected": sum(1 for _, status in samples if 400 <= status < 500),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": pick(1.0),
+            }
+        return out
+
+
+async def timed(recorder, endpoint, request):
+    start = time.perf_counter()
+    response = await request
+    recorder.add(endpoint, time.perf_counter() - start, response.status_code)
+    return response
+
+
+def seed(backend, n_flights, n_passengers, hot_seats, rng):
+    now = datetime.utcnow()
+    flights = []
+    for i in range(n_flights):
+        origin, destination = rng.sample(CITIES, 2)
+        departure = now + timedelta(hours=rng.randint(2, 24 * 60))
+        seats = rng.choice((120, 150, 180))
+        flights.append({
+            "Flight_no": f"LT{i}", "origin": origin, "destination": destination, "departure": departure,
+            "arrival": departure + timedelta(minutes=rng.randint(60, 240)), "base_fare": rng.randint(3000, 9000),
+            "total_seats": seats, "seats_available": seats, "airline_name": rng.choice(AIRLINES), "flight_status": "On Time",
+        })
+    departure = now + timedelta(days=2)
+    flights.append({
+        "Flight_no": HOT_FLIGHT_NO, "origin": "Delhi", "destination": "Mumbai", "departure": departure,
+        "arrival": departure + timedelta(hours=2), "base_fare": 5000, "total_seats": hot_seats,
+        "seats_available": hot_seats, "airline_name": "Air India", "flight_status": "On Time",
+    })
+    passengers = [
+        {"full_name": f"Load Test {i}", "contact_number": f"9{i:09d}", "email": f"lt{i}@example.com", "city": rng.choice(CITIES)}
+        for i in range(n_passengers)
+    ]
+    with backend.engine.begin() as conn:
+        conn.execute(backend.Flight.__table__.insert(), flights)
+        if passengers:
+            conn.execute(backend.Passenger.__table__.insert(), passengers)
+        hot_id = conn.execute(select(backend.Flight.Flight_id).where(backend.Flight.Flight_no == HOT_FLIGHT_NO)).scalar_one()
+    return [f["Flight_no"] for f in flights], [p["full_name"] for p in passengers] or ["Load Test"], hot_id
+
+
+async def browse_client(client, recorder, flight_nos, rng, deadline, list_ratio):
+    while time.monotonic() < deadline:
+        if rng.random() < list_ratio:
+            await timed(recorder, "GET /flights", client.get("/flights"))
+        else:
+            await timed(recorder, "GET /pricing/{flight_no}", client.get(f"/pricing/{rng.choice(flight_nos)}"))
+
+
+async def contention_client(client, recorder, hot_id, hot_seats, names, rng, deadline, cancel_ratio):
+    while time.monotonic() < deadline:
+        payload = {"flight_id": hot_id, "seat_no": rng.randint(1, hot_seats), "passenger_fullname": rng.choice(names)}
+        r = await timed(recorder, "POST /booking/reserve", client.post("/booking/reserve", json=payload))
+        if r.status_code != 200:
+            await asyncio.sleep(0.005)
+            continue
+        pnr = r.json()["pnr"]
+        r = await timed(recorder, "POST /bookings/pay/{pnr}", client.post(f"/bookings/pay/{pnr}", params={"payment_mode": "UPI"}))
+        if r.status_code != 202:
+            continue
+        payment_id = r.json().get("payment_id")
+        booking_status = "Payment Pending"
+        while payment_id and booking_status == "Payment Pending":
+            r = await timed(recorder, "GET /payments/{payment_id}", client.get(f"/payments/{payment_id}", params={"wait": 5}))
+            if r.status_code != 200:
+                break
+            booking_status = r.json()["booking_status"]
+        if booking_status == "Confirmed" and rng.random() < cancel_ratio:
+            await timed(recorder, "DELETE /bookings/cancel/{pnr}", client.delete(f"/bookings/cancel/{pnr}"))
+
+
+async def pricing_ticker(backend, recorder, interval, stop):
+    from fastapi.concurrency import run_in_threadpool
+    while not stop.is_set():
+        start = time.perf_counter()
+        await run_in_threadpool(backend.run_pricing_tick)
+        recorder.add("pricing tick", time.perf_counter() - start, 200)
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_phase(backend, name, args, client_factory):
+    import httpx
+    recorder = Recorder()
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+        ticker = asyncio.create_task(pricing_ticker(backend, recorder, args.pricing_interval, stop))
+        start = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(*(client_factory(client, recorder, random.Random(args.seed * 1000 + i), deadline)
+                               for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await ticker
+    return {"phase": name, "seconds": round(elapsed, 3), "endpoints": recorder.report(elapsed)}
+
+
+def wait_for_payments(backend, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with backend.engine.connect() as conn:
+            pending = conn.execute(select(func.count()).select_from(backend.Payment)
+                                   .where(backend.Payment.payment_status == "Pending")).scalar_one()
+        if not pending:
+            return 0
+        time.sleep(0.1)
+    return pending
+
+
+def check_invariants(backend, pending_payments):
+    Flight, Booking = backend.Flight, backend.Booking
+    with backend.engine.connect() as conn:
+        live = dict(conn.execute(
+            select(Booking.flight_id, func.count()).where(Booking.status.in_(LIVE_STATUSES)).group_by(Booking.flight_id)
+        ).all())
+        oversold, leaked = [], []
+        for flight_no, flight_id, total, available in conn.execute(
+            select(Flight.Flight_no, Flight.Flight_id, Flight.total_seats, Flight.seats_available)
+        ):
+            # More free seats than unbooked ones lets the flight oversell; fewer means seats leaked.
+            expected = (total or 0) - live.get(flight_id, 0)
+            if available is None or available < 0 or expected < 0 or available > expected:
+                oversold.append({"flight_no": flight_no, "seats_available": available, "expected": expected})
+            elif available < expected:
+                leaked.append({"flight_no": flight_no, "seats_available": available, "expected": expected})
+        # Every seat counted as free needs a seat number nobody holds, otherwise it can't be booked.
+        held = dict(conn.execute(
+            select(Booking.flight_id, func.count(Booking.seat_no.distinct())).where(Booking.status != "Cancelled")
+            .group_by(Booking.flight_id)
+        ).all())
+        unbookable = [
+            {"flight_no": flight_no, "seats_available": available, "free_seat_numbers": (total or 0) - held.get(flight_id, 0)}
+            for flight_no, flight_id, total, available in conn.execute(
+                select(Flight.Flight_no, Flight.Flight_id, Flight.total_seats, Flight.seats_available)
+            )
+            if available != (total or 0) - held.get(flight_id, 0)
+        ]
+        double_booked = [
+            {"flight_id": flight_id, "seat_no": seat_no, "bookings": count}
+            for flight_id, seat_no, count in conn.execute(
+                select(Booking.flight_id, Booking.seat_no, func.count()).where(Booking.status != "Cancelled", Booking.seat_no.isnot(None))
+                .group_by(Booking.flight_id, Booking.seat_no).having(func.count() > 1)
+            )
+        ]
+        bookings = conn.execute(select(func.count()).select_from(Booking)).scalar_one()
+    return {
+        "ok": not (oversold or leaked or unbookable or double_booked or pending_payments),
+        "bookings": bookings,
+        "oversold": oversold[:20],
+        "leaked": leaked[:20],
+        "unbookable": unbookable[:20],
+        "double_booked": double_booked[:20],
+        "pending_payments": pending_payments,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the booking lifecycle in-process.")
+    parser.add_argument("--db-url", help="defaults to a fresh SQLite file in a temp directory")
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--passengers", type=int, default=5000)
+    parser.add_argument("--hot-seats", type=int, default=50, help="seats on the contended flight")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--mix", default="browse,contention", help="comma-separated phases to run, in order")
+    parser.add_argument("--list-ratio", type=float, default=0.2, help="share of browse requests that list all flights")
+    parser.add_argument("--cancel-ratio", type=float, default=0.5, help="share of confirmed bookings cancelled again")
+    parser.add_argument("--pricing-interval", type=float, default=2.0)
+    parser.add_argument("--gateway-latency", type=float, nargs=2, default=(0.01, 0.05), metavar=("MIN", "MAX"))
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.db_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import backend
+
+    backend.payment_gateway = backend.StubPaymentGateway(latency=tuple(args.gateway_latency), failure_rate=args.failure_rate)
+    rng = random.Random(args.seed)
+    flight_nos, names, hot_id = seed(backend, args.flights, args.passengers, args.hot_seats, rng)
+
+    phases = {
+        "browse": lambda client, recorder, r, deadline: browse_client(client, recorder, flight_nos, r, deadline, args.list_ratio),
+        "contention": lambda client, recorder, r, deadline: contention_client(
+            client, recorder, hot_id, args.hot_seats, names, r, deadline, args.cancel_ratio),
+    }
+    results = []
+    for name in [m.strip() for m in args.mix.split(",") if m.strip()]:
+        if name not in phases:
+            parser.error(f"unknown mix {name!r}; choose from {', '.join(phases)}")
+        results.append(asyncio.run(run_phase(backend, name, args, phases[name])))
+
+    report = {
+        "commit": git_commit(),
+        "started": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "database": backend.engine.dialect.name,
+        "config": {k: v for k, v in vars(args).items() if k != "db_url"},
+        "phases": results,
+        "invariants": check_invariants(backend, wait_for_payments(backend, timeout=30)),
+    }
+    backend.payment_executor.shutdown(wait=True)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    print(text)
+    return 0 if report["invariants"]["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
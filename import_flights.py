@@ -0,0 +1,36 @@
+"""Bulk-load a seasonal flight schedule from CSV or NDJSON.
+
+    python import_flights.py schedule.csv
+    python import_flights.py schedule.ndjson --batch-size 10000
+    cat schedule.csv | python import_flights.py - --format csv
+
+CSV files need a header row using the Flight column names (Flight_no, airline_id,
+origin, destination, departure, arrival, base_fare, total_seats, seats_available,
+airline_name, flight_status); NDJSON files carry one object per line with the same keys.
+"""
+import argparse, io, json, sys
+
+from backend import FLIGHT_IMPORT_BATCH_SIZE, import_flight_schedule
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a flight schedule into the booking database.")
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=FLIGHT_IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl", ".json")) else "csv")
+    if args.path == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+        summary = import_flight_schedule(stream, fmt, max(1, args.batch_size))
+    else:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            summary = import_flight_schedule(stream, fmt, max(1, args.batch_size))
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Dynamic fare policy shared by the API (backend.py) and the offline backtester (backtest.py).
+
+Kept free of database and web imports so backtest sweeps can load it in worker
+processes without connecting to anything.
+"""
+import bisect, random
+from datetime import datetime
+
+# Fare multiplier = 1 + seat_weight * load + time factor + demand noise + tier factor.
+# time_factors apply to departures within 0, 1, 3 and 7 days (TIME_BUCKET_DAYS) and beyond.
+TIME_BUCKET_DAYS = (0, 1, 3, 7)
+MIN_FARE = 50.0
+PRICING_POLICY = {
+    "seat_weight": 0.4,
+    "time_factors": (0.6, 0.4, 0.2, 0.1, -0.05),
+    "demand_range": (-0.08, 0.25),
+    "premium_tier": 0.12,
+    "standard_tier": -0.03,
+}
+
+def is_premium_airline(airline_name) -> bool:
+    name = (airline_name or "").lower()
+    return "premium" in name or "air india" in name
+
+def calculate_dynamic_price(base_fare, seats_available, total_seats, departure, airline_name="standard", policy=PRICING_POLICY, now=None):
+    base = float(base_fare) if not isinstance(base_fare, float) else base_fare
+    seat_ratio = seats_available / total_seats if total_seats else 0
+    seat_factor = policy["seat_weight"] * (1 - seat_ratio)
+    days = (departure - (now or datetime.utcnow())).total_seconds() / 86400 if departure else 0
+    time_factor = policy["time_factors"][bisect.bisect_left(TIME_BUCKET_DAYS, days)]
+    demand_factor = random.uniform(*policy["demand_range"])
+    tier_factor = policy["premium_tier"] if is_premium_airline(airline_name) else policy["standard_tier"]
+    total_multiplier = 1 + seat_factor + time_factor + demand_factor + tier_factor
+    return max(round(base * total_multiplier, 2), MIN_FARE)